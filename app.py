@@ -1,11 +1,15 @@
 import streamlit as st
 import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from audio_processor import AudioProcessor
 from rag_system import RAGSystem
 from llm_handler import LLMHandler
 from utils import *
 from config import Config
 
+log = logging.getLogger(__name__)
+
 # Page configuration
 st.set_page_config(
     page_title="AI Meeting Summarizer",
@@ -45,21 +49,42 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_audio_processor():
+    """Shared AudioProcessor instance for all sessions"""
+    return AudioProcessor()
+
+@st.cache_resource
+def get_rag_system():
+    """Shared RAGSystem instance (embeddings + ChromaDB handle) for all sessions"""
+    rag_system = RAGSystem()
+    # Raising keeps cache_resource from sharing a failed instance, so later calls retry
+    if rag_system.vectorstore is None:
+        raise RuntimeError("Vector store is unavailable")
+    return rag_system
+
+@st.cache_resource
+def get_llm_handler():
+    """Shared LLMHandler instance (Ollama client) for all sessions"""
+    return LLMHandler()
+
 def initialize_components():
     """Initialize all system components"""
     if 'audio_processor' not in st.session_state:
-        st.session_state.audio_processor = AudioProcessor()
+        st.session_state.audio_processor = get_audio_processor()
     
     if 'rag_system' not in st.session_state:
-        st.session_state.rag_system = RAGSystem()
+        try:
+            st.session_state.rag_system = get_rag_system()
+        except RuntimeError:
+            # Retry once for this session only; if that fails too, summaries still work
+            # without vector storage, and the next session retries the shared instance
+            st.session_state.rag_system = RAGSystem()
     
     if 'llm_handler' not in st.session_state:
-        st.session_state.llm_handler = LLMHandler()
+        st.session_state.llm_handler = get_llm_handler()
 
 def main():
-    # Initialize components
-    initialize_components()
-    
     # Main header
     st.markdown('<h1 class="main-header">🎤 AI Meeting Summarizer</h1>', unsafe_allow_html=True)
     st.markdown("Transform your meeting recordings into actionable insights with AI-powered summarization")
@@ -94,7 +119,7 @@ def main():
         #         st.error("❌ AssemblyAI API Key Missing")
         
         # st.header("📊 Supported Formats")
-        # st.write(", ".join(Config.SUPPORTED_FORMATS))
+        # st.write(", ".join(Config.SUPPORTED_FORMATS_LIST))
         # st.write(f"Max file size: {Config.MAX_AUDIO_SIZE_MB}MB")
         # st.header("🐛 Debug Options")
         # debug_mode = st.checkbox("Enable Debug Mode", help="Shows detailed logs and test responses")
@@ -103,6 +128,9 @@ def main():
         # if debug_mode:
         #   st.warning("Debug mode enabled - check console for detailed logs")
     
+    # Initialize components once the header and sidebar have rendered
+    initialize_components()
+    
     # Main content area
     tab1, tab2, tab3 = st.tabs(["🔄 Process Meeting", "📚 Meeting History", "⚙️ Settings"])
     
@@ -112,8 +140,8 @@ def main():
         # File upload
         uploaded_file = st.file_uploader(
             "Choose an audio file",
-            type=['mp3', 'wav', 'm4a', 'mp4', 'webm'],
-            help=f"Supported formats: {', '.join(Config.SUPPORTED_FORMATS)}. Max size: {Config.MAX_AUDIO_SIZE_MB}MB"
+            type=[ext.lstrip('.') for ext in Config.SUPPORTED_FORMATS_LIST],
+            help=f"Supported formats: {', '.join(Config.SUPPORTED_FORMATS_LIST)}. Max size: {Config.MAX_AUDIO_SIZE_MB}MB"
         )
         
         if uploaded_file is not None:
@@ -135,9 +163,14 @@ def main():
             
             st.success(f"✅ {message}")
             
+            reprocess = st.checkbox(
+                "Reprocess even if this recording was processed before",
+                help="By default, saved results are reused for an identical recording"
+            )
+            
             # Process button
             if st.button("🚀 Generate Meeting Summary", type="primary", use_container_width=True):
-                process_meeting(uploaded_file)
+                process_meeting(uploaded_file, reprocess=reprocess)
     
     with tab2:
         st.markdown('<div class="section-header"><h2>Meeting History</h2></div>', unsafe_allow_html=True)
@@ -147,11 +180,29 @@ def main():
         st.markdown('<div class="section-header"><h2>System Configuration</h2></div>', unsafe_allow_html=True)
         display_settings()
 
-def process_meeting(uploaded_file):
+def process_meeting(uploaded_file, reprocess=False):
     """Process the uploaded meeting file"""
     
+    file_hash = get_file_hash(uploaded_file)
+    
+    # Reuse saved results for an identical recording (skips transcription and LLM calls)
+    if not reprocess:
+        previous = find_processed_meeting(file_hash)
+        if previous:
+            st.info(f"This recording was already processed as {previous['meeting_id']} - showing saved results.")
+            display_results(
+                previous['meeting_id'],
+                previous['transcript'],
+                previous['summary'],
+                now=datetime.datetime.fromisoformat(previous['timestamp'])
+            )
+            return
+    
+    # One timestamp for the meeting ID, the saved record and the report
+    now = datetime.datetime.now()
+    
     # Generate meeting ID
-    meeting_id = generate_meeting_id(uploaded_file)
+    meeting_id = generate_meeting_id(uploaded_file, file_hash, now=now)
     
     # Progress tracking
     progress_bar = st.progress(0)
@@ -159,10 +210,36 @@ def process_meeting(uploaded_file):
     
     try:
         # Step 1: Transcribe audio
-        status_text.text("Step 1/5: Transcribing audio...")
-        progress_bar.progress(20)
+        status_text.text("Step 1/3: Transcribing audio...")
+        progress_bar.progress(25)
+        
+        # Submit once per recording; a rerun mid-transcription resumes polling the same job
+        job_key = f"transcription_job_{file_hash}"
+        transcript_id = st.session_state.get(job_key)
+        
+        if not transcript_id:
+            transcript_id, error = st.session_state.audio_processor.submit_transcription(uploaded_file)
+            
+            if error:
+                st.error(f"Transcription failed: {error}")
+                return
+            
+            st.session_state[job_key] = transcript_id
         
-        transcript, error = st.session_state.audio_processor.transcribe_audio(uploaded_file)
+        transcript, error, finished = st.session_state.audio_processor.wait_for_transcript(
+            transcript_id,
+            on_status=lambda status: status_text.text(f"Step 1/3: Transcribing audio ({status})...")
+        )
+        
+        # Keep the job ID until AssemblyAI reports a final status, so a timeout or a
+        # transient polling error never leads to a second (billed) submission
+        if finished:
+            st.session_state.pop(job_key, None)
+        elif not error:
+            st.info("⏳ Transcription is still processing. Click Generate again to keep waiting.")
+            progress_bar.empty()
+            status_text.empty()
+            return
         
         if error:
             st.error(f"Transcription failed: {error}")
@@ -172,50 +249,49 @@ def process_meeting(uploaded_file):
             st.error("No transcript generated")
             return
         
-        # Step 2: Process and store in vector database
-        status_text.text("Step 2/5: Processing transcript and storing in vector database...")
-        progress_bar.progress(40)
+        # Step 2: Store in vector database and generate summary concurrently.
+        # The prompt already carries the full transcript, so the LLM doesn't
+        # need to wait for the stored chunks.
+        status_text.text("Step 2/3: Storing transcript and generating AI summary...")
+        progress_bar.progress(50)
         
-        success, message = st.session_state.rag_system.process_and_store_transcript(transcript, meeting_id)
+        # Split once; the chunks feed both the vector store and, for long
+        # transcripts, the map-reduce summary
+        chunks = st.session_state.rag_system.text_splitter.split_text(transcript)
         
-        if not success:
-            st.error(f"Vector storage failed: {message}")
-            return
-        
-        # Step 3: Retrieve context (for RAG)
-        status_text.text("Step 3/5: Retrieving relevant context...")
-        progress_bar.progress(60)
+        # The worker touches no st.* elements; all UI stays on the script thread
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            store_future = pool.submit(
+                st.session_state.rag_system.store_chunks, chunks, meeting_id, show_progress=False
+            )
+            
+            log.debug("Calling LLM with transcript length %d", len(transcript))
+            
+            if len(transcript) > Config.MAP_REDUCE_THRESHOLD_CHARS:
+                summary_data = st.session_state.llm_handler.generate_meeting_summary_mapreduce(chunks)
+            else:
+                summary_data = st.session_state.llm_handler.generate_meeting_summary(transcript)
+            
+            log.debug("LLM returned summary keys: %s", list(summary_data) if summary_data else None)
+            
+            success, message = store_future.result()
         
-        meeting_context = st.session_state.rag_system.get_meeting_context(meeting_id)
+        # Storage ran off-thread without UI, so report its outcome here
+        if success:
+            st.caption(f"🗂️ {message} in the vector database")
+        else:
+            st.warning(f"Vector storage failed: {message}")
         
-        # Step 4: Generate summary
-        status_text.text("Step 4/5: Generating AI summary...")
-        progress_bar.progress(80)
-    
-        print(f"🔍 DEBUG: About to call LLM with transcript length: {len(transcript)}")
-    
-    # Test with simple prompt first
-        if st.session_state.get('debug_mode', False):
-           st.write("🧪 **Debug Mode**: Testing simple prompt...")
-           test_response = st.session_state.llm_handler.test_simple_summary(transcript)
-           st.text_area("Test Response", test_response, height=300)
-    
-        summary_data = st.session_state.llm_handler.generate_meeting_summary(transcript, meeting_context)
-    
-        print(f"🔍 DEBUG: LLM returned: {type(summary_data)}")
-        if summary_data:
-           print(f"🔍 DEBUG: Summary keys: {list(summary_data.keys())}")
-    
         if not summary_data:
            st.error("Failed to generate summary - check console logs for details")
            return
         
-        # Step 5: Save and display results
-        status_text.text("Step 5/5: Finalizing results...")
+        # Step 3: Save and display results
+        status_text.text("Step 3/3: Finalizing results...")
         progress_bar.progress(100)
         
         # Save meeting data
-        save_success, save_path = save_meeting_data(meeting_id, transcript, summary_data)
+        save_success, save_path = save_meeting_data(meeting_id, transcript, summary_data, now=now)
         
         if save_success:
             st.success(f"✅ Meeting processed successfully! Data saved to {save_path}")
@@ -225,15 +301,17 @@ def process_meeting(uploaded_file):
         status_text.empty()
         
         # Display results
-        display_results(meeting_id, transcript, summary_data)
+        display_results(meeting_id, transcript, summary_data, now=now)
         
     except Exception as e:
         st.error(f"An error occurred during processing: {str(e)}")
         progress_bar.empty()
         status_text.empty()
 
-def display_results(meeting_id, transcript, summary_data):
+def display_results(meeting_id, transcript, summary_data, now=None):
     """Display the processed meeting results"""
+    if now is None:
+        now = datetime.datetime.now()
     
     st.markdown('<div class="section-header"><h2>📊 Meeting Analysis Results</h2></div>', unsafe_allow_html=True)
     
@@ -242,7 +320,7 @@ def display_results(meeting_id, transcript, summary_data):
     with col1:
         st.info(f"**Meeting ID:** {meeting_id}")
     with col2:
-        st.info(f"**Processed at:** {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        st.info(f"**Processed at:** {now.strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Display structured summary
     if 'error' not in summary_data:
@@ -279,7 +357,7 @@ def display_results(meeting_id, transcript, summary_data):
     
     with col1:
         # Download as text
-        download_content = create_download_data(meeting_id, transcript, summary_data)
+        download_content = create_download_data(meeting_id, transcript, summary_data, now=now)
         st.download_button(
             label="📄 Download Summary Report",
             data=download_content,
@@ -292,7 +370,7 @@ def display_results(meeting_id, transcript, summary_data):
         # Download transcript only
         st.download_button(
             label="📝 Download Transcript Only",
-            data=transcript,
+            data=transcript.encode('utf-8'),
             file_name=f"{meeting_id}_transcript.txt",
             mime="text/plain",
             use_container_width=True
@@ -300,34 +378,47 @@ def display_results(meeting_id, transcript, summary_data):
 
 def display_meeting_history():
     """Display history of processed meetings"""
-    data_dir = "meeting_data"
+    data_dir = Config.MEETING_DATA_DIR
     
     if not os.path.exists(data_dir):
         st.info("No meetings processed yet.")
         return
     
-    meeting_files = [f for f in os.listdir(data_dir) if f.endswith('.json')]
+    # Meeting IDs start with their timestamp, so they sort and label without opening the files
+    with os.scandir(data_dir) as it:
+        meeting_ids = sorted(
+            (
+                meeting_id
+                for entry in it
+                if (meeting_id := meeting_id_from_filename(entry.name))
+            ),
+            reverse=True
+        )
     
-    if not meeting_files:
+    if not meeting_ids:
         st.info("No meetings found in history.")
         return
     
-    st.write(f"Found {len(meeting_files)} processed meetings:")
+    st.write(f"Found {len(meeting_ids)} processed meetings:")
     
-    for file in sorted(meeting_files, reverse=True):
-        meeting_data = load_meeting_data(file.replace('.json', ''))
+    for meeting_id in meeting_ids:
+        saved_at = meeting_saved_at(meeting_id)
         
-        if meeting_data:
-            with st.expander(f"📋 {meeting_data['meeting_id']} - {meeting_data['timestamp'][:19]}"):
-                st.write("**Summary:**")
-                st.write(meeting_data['summary'].get('summary', 'Not available')[:200] + "...")
+        with st.expander(f"📋 {meeting_id} - {saved_at}" if saved_at else f"📋 {meeting_id}"):
+            # Expander bodies run on every rerun, so the file is only read on request
+            if st.button(f"View Full Report", key=f"view_{meeting_id}"):
+                meeting_data = load_meeting_data(meeting_id)
                 
-                if st.button(f"View Full Report", key=f"view_{file}"):
-                    display_results(
-                        meeting_data['meeting_id'],
-                        meeting_data['transcript'],
-                        meeting_data['summary']
-                    )
+                if not meeting_data:
+                    st.warning("Could not load this meeting.")
+                    continue
+                
+                display_results(
+                    meeting_data['meeting_id'],
+                    meeting_data['transcript'],
+                    meeting_data['summary'],
+                    now=datetime.datetime.fromisoformat(meeting_data['timestamp'])
+                )
 
 def display_settings():
     """Display system settings and configuration"""
@@ -338,16 +429,18 @@ def display_settings():
     with col1:
         st.markdown("**Audio Processing:**")
         st.write(f"- Max file size: {Config.MAX_AUDIO_SIZE_MB}MB")
-        st.write(f"- Supported formats: {', '.join(Config.SUPPORTED_FORMATS)}")
+        st.write(f"- Supported formats: {', '.join(Config.SUPPORTED_FORMATS_LIST)}")
         
         st.markdown("**Text Processing:**")
         st.write(f"- Chunk size: {Config.CHUNK_SIZE}")
         st.write(f"- Chunk overlap: {Config.CHUNK_OVERLAP}")
+        st.write(f"- Map-reduce summary above: {Config.MAP_REDUCE_THRESHOLD_CHARS} characters")
     
     with col2:
         st.markdown("**AI Models:**")
         st.write(f"- LLM Model: {Config.OLLAMA_MODEL}")
         st.write(f"- Embedding Model: {Config.EMBEDDING_MODEL}")
+        st.write(f"- Embedding concurrency: {Config.EMBEDDING_CONCURRENCY}")
         st.write(f"- Temperature: {Config.TEMPERATURE}")
         st.write(f"- Max tokens: {Config.MAX_TOKENS}")
     
@@ -367,6 +460,24 @@ def display_settings():
         else:
             st.warning("Please enter a valid API key.")
     
+    st.markdown("### 🧪 LLM Prompt Test")
+    
+    test_transcript = st.text_area(
+        "Sample transcript",
+        help="Runs a short test prompt against the Ollama model (first 1000 characters)"
+    )
+    
+    if st.button("Run Test Prompt"):
+        if test_transcript.strip():
+            with st.spinner("Running test prompt..."):
+                test_response = st.session_state.llm_handler.test_simple_summary(test_transcript)
+            if test_response:
+                st.text_area("Test Response", test_response, height=300)
+            else:
+                st.error("Test prompt failed - check console logs for details")
+        else:
+            st.warning("Please enter a sample transcript.")
+    
     st.markdown("### 📊 System Information")
     st.write(f"- Vector DB Path: {Config.VECTOR_DB_PATH}")
     st.write(f"- Collection Name: {Config.COLLECTION_NAME}")
@@ -1,12 +1,13 @@
-import assemblyai as aai
-import streamlit as st
 from config import Config
 import tempfile
+import shutil
+import time
 import os
 
 class AudioProcessor:
     def __init__(self):
-        aai.settings.api_key = Config.ASSEMBLY_AI_API_KEY
+        # assemblyai is imported on first use to keep app start-up fast
+        self.api_key = Config.ASSEMBLY_AI_API_KEY
         
     def validate_audio_file(self, audio_file):
         """Validate uploaded audio file"""
@@ -18,18 +19,26 @@ class AudioProcessor:
             return False, f"File size exceeds {Config.MAX_AUDIO_SIZE_MB}MB limit"
         
         # Check file format
-        file_extension = os.path.splitext(audio_file.name)[1].lower()
-        if file_extension not in Config.SUPPORTED_FORMATS:
-            return False, f"Unsupported format. Supported: {', '.join(Config.SUPPORTED_FORMATS)}"
+        _, file_extension = os.path.splitext(audio_file.name)
+        if file_extension.lower() not in Config.SUPPORTED_FORMATS:
+            return False, f"Unsupported format. Supported: {', '.join(Config.SUPPORTED_FORMATS_LIST)}"
         
         return True, "Valid file"
     
-    def transcribe_audio(self, audio_file):
-        """Transcribe audio using AssemblyAI"""
+    def submit_transcription(self, audio_file):
+        """Submit audio to AssemblyAI without waiting for the transcript.
+        
+        Returns (transcript_id, error).
+        """
+        import assemblyai as aai
+        aai.settings.api_key = self.api_key
+        
+        tmp_file_path = None
         try:
-            # Save uploaded file to temporary location
+            # Stream uploaded file to a temporary location in 1 MiB chunks
+            audio_file.seek(0)
             with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(audio_file.name)[1]) as tmp_file:
-                tmp_file.write(audio_file.getvalue())
+                shutil.copyfileobj(audio_file, tmp_file, length=1 << 20)
                 tmp_file_path = tmp_file.name
             
             # Configure transcription settings
@@ -37,25 +46,55 @@ class AudioProcessor:
                 speaker_labels=True
             )
             
-            # Create transcriber and transcribe
+            # Upload and queue the job; returns as soon as AssemblyAI has the file
             transcriber = aai.Transcriber(config=config)
-            
-            with st.spinner("Transcribing audio... This may take a few minutes."):
-                transcript = transcriber.transcribe(tmp_file_path)
-            
-            # Clean up temporary file
-            os.unlink(tmp_file_path)
+            transcript = transcriber.submit(tmp_file_path)
             
             if transcript.status == aai.TranscriptStatus.error:
                 return None, f"Transcription failed: {transcript.error}"
             
-            # Format transcript with speaker labels if available
-            formatted_transcript = self._format_transcript(transcript)
-            
-            return formatted_transcript, None
+            return transcript.id, None
             
         except Exception as e:
-            return None, f"Error during transcription: {str(e)}"
+            return None, f"Error submitting transcription: {str(e)}"
+        finally:
+            # The upload is done, so the temporary file can go
+            if tmp_file_path and os.path.exists(tmp_file_path):
+                os.unlink(tmp_file_path)
+    
+    def wait_for_transcript(self, transcript_id, on_status=None):
+        """Poll a submitted transcription job until it finishes or the wait times out.
+        
+        on_status, if given, is called with the job status after each poll.
+        Returns (transcript_text, error, finished). finished is True only once the
+        job has completed or failed on AssemblyAI's side; after a timeout or a
+        polling error it is False and the job can be polled again later.
+        """
+        import assemblyai as aai
+        aai.settings.api_key = self.api_key
+        
+        deadline = time.monotonic() + Config.TRANSCRIPTION_TIMEOUT_SECONDS
+        try:
+            while True:
+                transcript = aai.Transcript.get_by_id(transcript_id)
+                
+                if on_status:
+                    on_status(transcript.status.value)
+                
+                if transcript.status == aai.TranscriptStatus.error:
+                    return None, f"Transcription failed: {transcript.error}", True
+                
+                if transcript.status == aai.TranscriptStatus.completed:
+                    # Format transcript with speaker labels if available
+                    return self._format_transcript(transcript), None, True
+                
+                if time.monotonic() >= deadline:
+                    return None, None, False
+                
+                time.sleep(Config.TRANSCRIPTION_POLL_SECONDS)
+                
+        except Exception as e:
+            return None, f"Error checking transcription status: {str(e)}", False
     
     def _format_transcript(self, transcript):
         """Format transcript with speaker labels"""
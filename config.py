@@ -10,11 +10,15 @@ class Config:
     # Ollama Configuration
     OLLAMA_BASE_URL = "http://localhost:11434"
     OLLAMA_MODEL = "llama2:latest"
-    EMBEDDING_MODEL = "llama2:latest"
+    EMBEDDING_MODEL = "nomic-embed-text"
+    EMBEDDING_CONCURRENCY = 4
     
     # Vector Database Configuration
     VECTOR_DB_PATH = "./chroma_db"
-    COLLECTION_NAME = "meeting_transcripts"
+    COLLECTION_NAME = "meeting_transcripts_nomic"  # new dimension, new collection
+    
+    # Meeting History Configuration
+    MEETING_DATA_DIR = "meeting_data"
     
     # Chunking Configuration
     CHUNK_SIZE = 1000
@@ -22,8 +26,13 @@ class Config:
     
     # Audio Configuration
     MAX_AUDIO_SIZE_MB = 250
-    SUPPORTED_FORMATS = ['.mp3', '.wav', '.m4a', '.webm']
+    TRANSCRIPTION_POLL_SECONDS = 3
+    TRANSCRIPTION_TIMEOUT_SECONDS = 600  # per click; the job keeps running remotely
+    SUPPORTED_FORMATS_LIST = ['.mp3', '.wav', '.m4a', '.mp4', '.webm']  # display order
+    SUPPORTED_FORMATS = frozenset(SUPPORTED_FORMATS_LIST)
     
     # LLM Configuration
     TEMPERATURE = 0.3
-    MAX_TOKENS = 2000
+    MAX_TOKENS = 1200
+    # Transcripts longer than this are summarized map-reduce style over chunk groups
+    MAP_REDUCE_THRESHOLD_CHARS = 8000
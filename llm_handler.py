@@ -1,20 +1,76 @@
-import ollama
 from config import Config
 import streamlit as st
 import re
+import json
+import logging
+
+log = logging.getLogger(__name__)
+
+# Section headers recognised by _parse_markdown_response, compiled once at import.
+# Each named group is the summary key its section is stored under; the
+# "KEY DETAILS EXTRACTED" wrapper only marks a boundary. A header either sits
+# alone on its line or ends in a colon with its content following inline.
+# Bullet lines only count when they carry a markdown "#" header, so body
+# bullets such as "- Action items: ..." stay in their section.
+_HEADER_RE = re.compile(
+    r'^[ \t]*(?:(?:[-*+][ \t]+)?(?P<hashes>#{1,3})[ \t]*[^\w\n]*?'
+    r'|(?:\*\*)?[ \t]*[^\w\n#*+\-]*?)[ \t]*'
+    r'(?:(?P<summary>MEETING\s+SUMMARY)'
+    r'|(?P<details>KEY\s+DETAILS\s+EXTRACTED)'
+    r'|(?P<meeting_info>Meeting\s+Information)'
+    r'|(?P<topics>Main\s+Topics\s+Discussed)'
+    r'|(?P<action_items>Action\s+Items(?:\s*&\s*Next\s+Steps)?)'
+    r'|(?P<decisions>Key\s+Decisions(?:\s+Made)?)'
+    r'|(?P<notes>Important\s+Notes(?:\s*&\s*Follow-ups)?))'
+    r'(?:[^\w\n]*$|[ \t]*\**[ \t]*:[ \t]*\**[ \t]*)',
+    re.MULTILINE | re.IGNORECASE
+)
+_SECTION_KEYS = ('summary', 'meeting_info', 'topics', 'action_items', 'decisions', 'notes')
+
+def _to_inline(value):
+    """Render a JSON value on a single line, for use inside one bullet"""
+    if isinstance(value, dict):
+        return ", ".join(f"**{key}**: {_to_inline(item)}" for key, item in value.items())
+    if isinstance(value, list):
+        return ", ".join(_to_inline(item) for item in value)
+    return str(value).strip()
+
+def _to_markdown(value):
+    """Render a JSON summary field (string, list or mapping) as markdown"""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return "\n".join(f"- **{key}**: {_to_inline(item)}" for key, item in value.items())
+    if isinstance(value, list):
+        # One bullet per item; object items (e.g. task/owner pairs) stay on their line
+        return "\n".join(f"- {_to_inline(item)}" for item in value)
+    return str(value).strip()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _check_model(host, model):
+    """Check the Ollama server for a model, cached across reruns.
+
+    Returns (is_available, available_model_names). Failures raise and are not cached.
+    """
+    import ollama
+    
+    models = ollama.Client(host=host).list()['models']
+    available_models = [m['name'] for m in models]
+    return model in available_models, available_models
 
 class LLMHandler:
     def __init__(self):
+        import ollama  # deferred to keep app start-up fast
+        
         self.client = ollama.Client(host=Config.OLLAMA_BASE_URL)
         self.model = Config.OLLAMA_MODEL
     
     def check_model_availability(self):
         """Check if the required model is available"""
         try:
-            models = self.client.list()['models']
-            available_models = [model['name'] for model in models]
+            is_available, available_models = _check_model(Config.OLLAMA_BASE_URL, self.model)
             
-            if self.model not in available_models:
+            if not is_available:
                 st.error(f"Model '{self.model}' not found. Available models: {available_models}")
                 st.info(f"Please run: `ollama pull {self.model}` to download the model")
                 return False
@@ -34,12 +90,11 @@ class LLMHandler:
             options={'temperature': 0.1, 'num_predict': 500}
         )
         
-        print("🧪 TEST RESPONSE:")
-        print(response['response'])
+        log.debug("Test response:\n%s", response['response'])
         return response['response']
         
       except Exception as e:
-        print(f"❌ TEST ERROR: {str(e)}")
+        log.error("Test prompt failed: %s", e)
         return None
 
     def _create_simple_test_prompt(self, transcript):
@@ -65,68 +120,106 @@ Respond in exactly the format shown above. [/INST]"""
         
         # Combine transcript with any additional context from RAG
         full_context = transcript
-        if meeting_context:
+        if meeting_context and meeting_context != transcript:
             full_context += f"\n\nAdditional Context:\n{meeting_context}"
         
         prompt = self._create_summary_prompt(full_context)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Summary prompt is ~%d words", len(prompt.split()))
         
         try:
-            with st.spinner("Generating comprehensive meeting summary..."):
+            stream = self.client.generate(
+                model=self.model,
+                prompt=prompt,
+                stream=True,
+                format='json',
+                options={
+                    'temperature': Config.TEMPERATURE,
+                    'num_predict': Config.MAX_TOKENS,
+                    'top_k': 40,
+                    'top_p': 0.9,
+                    'stop': ['[INST]', '</s>']
+                }
+            )
+            
+            # Show tokens as they arrive, then swap the raw text for the parsed summary
+            live_output = st.empty()
+            response = live_output.write_stream(chunk['response'] for chunk in stream)
+            live_output.empty()
+            
+            return self._parse_summary_response(response)
+            
+        except Exception as e:
+            st.error(f"Error generating summary: {str(e)}")
+            return None
+    
+    def generate_meeting_summary_mapreduce(self, chunks):
+        """Summarize a long transcript part by part, then summarize the combined notes"""
+        
+        # Group consecutive chunks so each map prompt stays under the threshold
+        groups, current = [], ""
+        for chunk in chunks:
+            if current and len(current) + len(chunk) > Config.MAP_REDUCE_THRESHOLD_CHARS:
+                groups.append(current)
+                current = ""
+            current = f"{current}\n{chunk}" if current else chunk
+        if current:
+            groups.append(current)
+        
+        log.debug("Map-reduce over %d parts from %d chunks", len(groups), len(chunks))
+        
+        notes = []
+        try:
+            progress = st.progress(0, text="Summarizing transcript parts...")
+            for i, group in enumerate(groups):
                 response = self.client.generate(
                     model=self.model,
-                    prompt=prompt,
+                    prompt=self._create_part_prompt(group, i + 1, len(groups)),
                     options={
                         'temperature': Config.TEMPERATURE,
-                        'num_predict': Config.MAX_TOKENS,
-                        'top_k': 40,
-                        'top_p': 0.9,
+                        'num_predict': 400,
                         'stop': ['[INST]', '</s>']
                     }
                 )
-            
-            return self._parse_summary_response(response['response'])
-            
+                notes.append(f"Part {i + 1}:\n{response['response'].strip()}")
+                progress.progress((i + 1) / len(groups), text=f"Summarized part {i + 1}/{len(groups)}")
+            progress.empty()
         except Exception as e:
-            st.error(f"Error generating summary: {str(e)}")
+            st.error(f"Error summarizing transcript parts: {str(e)}")
             return None
+        
+        return self.generate_meeting_summary("\n\n".join(notes))
+    
+    def _create_part_prompt(self, transcript_part, part_number, total_parts):
+        """Create the map prompt for one part of a long transcript"""
+        return f"""[INST] <<SYS>>
+You are an expert meeting analyst. You will receive part {part_number} of {total_parts} of a meeting transcript.
+Write concise notes covering the discussion, participants, dates, action items (with owners and due dates), decisions, and follow-ups in this part.
+Only include information that is explicitly mentioned in the transcript.
+<</SYS>>
+
+TRANSCRIPT PART {part_number}/{total_parts}:
+{transcript_part}
+
+Respond with the notes only. [/INST]"""
     
     def _create_summary_prompt(self, transcript):
         """Create the optimized prompt for Llama2"""
         return f"""[INST] <<SYS>>
 You are an expert meeting analyst specializing in comprehensive meeting summarization and key information extraction. Your task is to analyze meeting transcripts and provide structured, actionable insights.
 
-Always follow this exact output format:
+Always respond with a single JSON object with exactly these keys:
 
-## MEETING SUMMARY
-[Provide a comprehensive summary in 250-300 words covering the main discussion points, decisions made, and overall meeting flow]
-
-## KEY DETAILS EXTRACTED
-### 📅 Meeting Information
-- **Date**: [Extract or indicate if not mentioned]
-- **Duration**: [Extract or indicate if not mentioned]  
-- **Participants**: [List participants mentioned]
-
-### 🎯 Main Topics Discussed
-- [Topic 1 with brief description]
-- [Topic 2 with brief description]
-- [Continue as needed]
-
-### ⚡ Action Items & Next Steps
-- [Action item 1] - Assigned to: [Person] - Due: [Date if mentioned]
-- [Action item 2] - Assigned to: [Person] - Due: [Date if mentioned]
-- [Continue as needed]
-
-### 🔑 Key Decisions Made
-- [Decision 1 with context]
-- [Decision 2 with context]
-- [Continue as needed]
-
-### 📋 Important Notes & Follow-ups
-- [Important point 1]
-- [Important point 2]
-- [Continue as needed]
-
-Only extract information that is explicitly mentioned in the transcript. If information is not available, indicate "Not specified in transcript".
+{{
+  "summary": "A comprehensive summary in 250-300 words covering the main discussion points, decisions made, and overall meeting flow",
+  "meeting_info": ["Date: ...", "Duration: ...", "Participants: ..."],
+  "topics": ["Topic with brief description", "..."],
+  "action_items": ["Action item - Assigned to: Person - Due: Date if mentioned", "..."],
+  "decisions": ["Decision with context", "..."],
+  "notes": ["Important point or follow-up", "..."]
+}}
+
+Only extract information that is explicitly mentioned in the transcript. If information is not available, use "Not specified in transcript".
 <</SYS>>
 
 Analyze the following meeting transcript and provide a structured summary with extracted key details:
@@ -134,103 +227,72 @@ Analyze the following meeting transcript and provide a structured summary with e
 TRANSCRIPT:
 {transcript}
 
-Please provide the analysis following the exact format specified above. [/INST]"""
+Respond with the JSON object only. [/INST]"""
     
     def _parse_summary_response(self, response):
-     """Parse the LLM response into structured components with better error handling"""
+        """Parse the LLM's JSON response, falling back to markdown sections if malformed"""
+        try:
+            data = json.loads(response)
+        except (TypeError, ValueError):
+            data = None
+        
+        if isinstance(data, dict) and any(data.get(key) for key in _SECTION_KEYS):
+            sections = {}
+            for section_name in _SECTION_KEYS:
+                content = _to_markdown(data.get(section_name))
+                if content.strip():
+                    sections[section_name] = content
+                else:
+                    sections[section_name] = f"{section_name.replace('_', ' ').title()} not available"
+            return sections
+        
+        log.debug("Response is not valid JSON, parsing markdown sections")
+        return self._parse_markdown_response(response)
+    
+    def _parse_markdown_response(self, response):
+     """Parse a markdown-formatted LLM response into structured components"""
      try:
          sections = {}
         
         # Clean the response
          response = response.strip()
         
-        # Debug: Print response structure
-         print(f"🔍 DEBUG: Response has {len(response)} characters")
-         print(f"🔍 DEBUG: Looking for section markers...")
-        
-        # More flexible regex patterns (case insensitive, flexible spacing)
-         patterns = {
-            'summary': [
-                r'## MEETING SUMMARY\s*(.*?)(?=##|###|$)',
-                r'##\s*MEETING\s*SUMMARY\s*(.*?)(?=##|###|$)',
-                r'MEETING SUMMARY[:\s]*(.*?)(?=MEETING INFORMATION|KEY DETAILS|$)'
-            ],
-            'meeting_info': [
-                r'### 📅 Meeting Information\s*(.*?)(?=###|$)',
-                r'###\s*📅\s*Meeting Information\s*(.*?)(?=###|$)',
-                r'MEETING INFORMATION[:\s]*(.*?)(?=MAIN TOPICS|$)'
-            ],
-            'topics': [
-                r'### 🎯 Main Topics Discussed\s*(.*?)(?=###|$)',
-                r'###\s*🎯\s*Main Topics Discussed\s*(.*?)(?=###|$)',
-                r'MAIN TOPICS DISCUSSED[:\s]*(.*?)(?=ACTION ITEMS|$)'
-            ],
-            'action_items': [
-                r'### ⚡ Action Items & Next Steps\s*(.*?)(?=###|$)',
-                r'###\s*⚡\s*Action Items & Next Steps\s*(.*?)(?=###|$)',
-                r'ACTION ITEMS[:\s]*(.*?)(?=KEY DECISIONS|$)'
-            ],
-            'decisions': [
-                r'### 🔑 Key Decisions Made\s*(.*?)(?=###|$)',
-                r'###\s*🔑\s*Key Decisions Made\s*(.*?)(?=###|$)',
-                r'KEY DECISIONS[:\s]*(.*?)(?=IMPORTANT NOTES|$)'
-            ],
-            'notes': [
-                r'### 📋 Important Notes & Follow-ups\s*(.*?)(?=###|$)',
-                r'###\s*📋\s*Important Notes & Follow-ups\s*(.*?)(?=###|$)',
-                r'IMPORTANT NOTES[:\s]*(.*?)$'
-            ]
-        }
+         log.debug("Parsing markdown response of %d characters", len(response))
         
-        # Try multiple patterns for each section
-         for section_name, pattern_list in patterns.items():
-            content = None
-            for pattern in pattern_list:
-                match = re.search(pattern, response, re.DOTALL | re.IGNORECASE)
-                if match:
-                    content = match.group(1).strip()
-                    print(f"🔍 DEBUG: Found {section_name} using pattern {pattern[:30]}...")
-                    break
-            
-            if content and content.strip():
-                sections[section_name] = content
-            else:
+        # Single pass over the headers. A "#" header wins over the colon form of
+        # the same section, otherwise the first one wins; each body runs up to
+        # the next chosen header, so passed-over candidates stay in the text.
+         chosen = {}
+         for match in _HEADER_RE.finditer(response):
+            section_name = match.lastgroup
+            if section_name == 'details':
+                chosen[match.start()] = match
+                continue
+            current = chosen.get(section_name)
+            if current is None or (match.group('hashes') and not current.group('hashes')):
+                chosen[section_name] = match
+         headers = sorted(chosen.values(), key=lambda m: m.start())
+         for i, match in enumerate(headers):
+            section_name = match.lastgroup
+            if section_name == 'details':
+                continue
+            body_end = headers[i + 1].start() if i + 1 < len(headers) else len(response)
+            sections[section_name] = response[match.end():body_end].strip()
+        
+         for section_name in _SECTION_KEYS:
+            if not sections.get(section_name):
                 sections[section_name] = f"{section_name.replace('_', ' ').title()} not available"
-                print(f"⚠️  DEBUG: No content found for {section_name}")
         
         # If no sections found at all, return the raw response
          if all(val.endswith("not available") for val in sections.values()):
-            print("❌ DEBUG: No sections parsed successfully, returning raw response")
+            log.warning("No sections parsed successfully, returning raw response")
             sections['summary'] = response
             sections['error'] = "Failed to parse structured response - showing raw output"
          return sections
         
      except Exception as e:
-        print(f"❌ DEBUG: Error parsing response: {str(e)}")
+        log.warning("Error parsing response: %s", e)
         return {
             "summary": response if response else "No response received", 
             "error": f"Failed to parse structured response: {str(e)}"
         }
-
-
-# Add a test method
-    def test_simple_summary(self, transcript):
-     """Test with simplified prompt"""
-     prompt = self._create_simple_test_prompt(transcript)
-    
-     try:
-        response = self.client.generate(
-            model=self.model,
-            prompt=prompt,
-            options={'temperature': 0.1, 'num_predict': 500}
-        )
-        
-        print("🧪 TEST RESPONSE:")
-        print(response['response'])
-        return response['response']
-        
-     except Exception as e:
-        print(f"❌ TEST ERROR: {str(e)}")
-        return None
-
-
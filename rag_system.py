@@ -1,17 +1,39 @@
 import os
 # Disable ChromaDB telemetry to avoid errors
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
-import chromadb
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores import Chroma
-from langchain.embeddings import OllamaEmbeddings
-import ollama
 from config import Config
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+
+# chromadb, langchain and numpy are imported on first use to keep app start-up fast
+
+@lru_cache(maxsize=None)
+def _concurrent_embeddings_class():
+    """Build the ConcurrentOllamaEmbeddings class (imports langchain on first call)"""
+    from langchain.embeddings import OllamaEmbeddings
+    
+    class ConcurrentOllamaEmbeddings(OllamaEmbeddings):
+        """OllamaEmbeddings that embeds document chunks with concurrent requests"""
+        
+        max_workers: int = Config.EMBEDDING_CONCURRENCY
+        
+        def _embed(self, input):
+            """Embed texts in parallel instead of one HTTP round-trip at a time"""
+            if len(input) <= 1:
+                return super()._embed(input)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # map preserves input order, so embeddings line up with chunks
+                return list(executor.map(self._process_emb_response, input))
+    
+    return ConcurrentOllamaEmbeddings
 
 class RAGSystem:
     def __init__(self):
-        self.embeddings = OllamaEmbeddings(
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        
+        self.embeddings = _concurrent_embeddings_class()(
             base_url=Config.OLLAMA_BASE_URL,
             model=Config.EMBEDDING_MODEL
         )
@@ -26,10 +48,15 @@ class RAGSystem:
     def _initialize_vectorstore(self):
         """Initialize ChromaDB vector store"""
         try:
+            import chromadb
+            from langchain.vectorstores import Chroma
+            
+            # PersistentClient writes through to disk, so no explicit persist() is needed
+            client = chromadb.PersistentClient(path=Config.VECTOR_DB_PATH)
             self.vectorstore = Chroma(
+                client=client,
                 collection_name=Config.COLLECTION_NAME,
-                embedding_function=self.embeddings,
-                persist_directory=Config.VECTOR_DB_PATH
+                embedding_function=self.embeddings
             )
         except Exception as e:
             st.error(f"Error initializing vector store: {str(e)}")
@@ -41,34 +68,42 @@ class RAGSystem:
             with st.spinner("Splitting transcript into chunks..."):
                 chunks = self.text_splitter.split_text(transcript)
             
+            return self.store_chunks(chunks, meeting_id)
+            
+        except Exception as e:
+            return False, f"Error processing transcript: {str(e)}"
+    
+    def store_chunks(self, chunks, meeting_id, show_progress=True):
+        """Store already-split transcript chunks in vector database.
+        
+        Pass show_progress=False when calling off the script thread: Streamlit
+        elements must only be created from the thread running the script.
+        """
+        try:
             if not chunks:
                 return False, "No chunks created from transcript"
             
-            # Create metadata for each chunk
-            metadatas = []
-            for i, chunk in enumerate(chunks):
-                metadatas.append({
-                    "meeting_id": meeting_id,
-                    "chunk_index": i,
-                    "chunk_type": "transcript",
-                    "total_chunks": len(chunks)
-                })
+            # Create metadata and IDs for each chunk
+            n = len(chunks)
+            metadatas = [
+                {"meeting_id": meeting_id, "chunk_index": i, "chunk_type": "transcript", "total_chunks": n}
+                for i in range(n)
+            ]
+            ids = [f"{meeting_id}_chunk_{i}" for i in range(n)]
             
             # Store in vector database
-            with st.spinner(f"Storing {len(chunks)} chunks in vector database..."):
+            spinner = st.spinner(f"Storing {n} chunks in vector database...") if show_progress else nullcontext()
+            with spinner:
                 self.vectorstore.add_texts(
                     texts=chunks,
                     metadatas=metadatas,
-                    ids=[f"{meeting_id}_chunk_{i}" for i in range(len(chunks))]
+                    ids=ids
                 )
-                
-                # Persist the database
-                self.vectorstore.persist()
             
-            return True, f"Successfully stored {len(chunks)} chunks"
+            return True, f"Successfully stored {n} chunks"
             
         except Exception as e:
-            return False, f"Error processing transcript: {str(e)}"
+            return False, f"Error storing chunks: {str(e)}"
     
     def retrieve_relevant_chunks(self, query, k=5):
         """Retrieve relevant chunks for a query"""
@@ -94,17 +129,20 @@ class RAGSystem:
             if not self.vectorstore:
                 return ""
             
-            # Get all chunks for the meeting
-            results = self.vectorstore.get(
-                where={"meeting_id": meeting_id}
+            # Get all chunks for the meeting (documents and metadata only, no embeddings)
+            results = self.vectorstore._collection.get(
+                where={"meeting_id": meeting_id},
+                include=["documents", "metadatas"]
             )
             
             if results and results['documents']:
-                # Sort chunks by index and combine
-                chunks_with_metadata = list(zip(results['documents'], results['metadatas']))
-                sorted_chunks = sorted(chunks_with_metadata, key=lambda x: x[1]['chunk_index'])
+                import numpy as np
+                
+                # Order chunks by index and combine
+                order = np.argsort([metadata['chunk_index'] for metadata in results['metadatas']])
+                documents = results['documents']
                 
-                return " ".join([chunk[0] for chunk in sorted_chunks])
+                return " ".join(documents[i] for i in order)
             
             return ""
             
@@ -1,108 +1,220 @@
 import streamlit as st
-import hashlib
 import datetime
+import gzip
 import json
 import os
+import xxhash
+from config import Config
 
-def generate_meeting_id(audio_file):
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
+
+# Create the data directory once per process rather than on every save
+try:
+    os.makedirs(Config.MEETING_DATA_DIR, exist_ok=True)
+except OSError:  # e.g. read-only filesystem; save_meeting_data reports the failure
+    pass
+
+# Meetings are saved as gzipped JSON; plain .json files from earlier versions still load
+_MEETING_SUFFIXES = ('.json.gz', '.json')
+
+_SEP = '=' * 50
+
+def _report_header(title):
+    return f"\n\n{_SEP}\n{title}\n{_SEP}\n"
+
+# Summary keys in report order, with their section titles
+_REPORT_SECTIONS = (
+    ('summary', "MEETING SUMMARY"),
+    ('meeting_info', "MEETING INFORMATION"),
+    ('topics', "MAIN TOPICS DISCUSSED"),
+    ('action_items', "ACTION ITEMS & NEXT STEPS"),
+    ('decisions', "KEY DECISIONS MADE"),
+    ('notes', "IMPORTANT NOTES & FOLLOW-UPS"),
+)
+
+_REPORT_KEYS = tuple(key for key, _ in _REPORT_SECTIONS)
+_NOT_AVAILABLE = "Not available"
+
+# Report layout for create_download_data, built once at import and filled with one format() call
+_REPORT_TEMPLATE = (
+    "MEETING SUMMARY REPORT\nGenerated on: {generated_on}\nMeeting ID: {meeting_id}"
+    + "".join(_report_header(title) + "{" + key + "}" for key, title in _REPORT_SECTIONS)
+    + _report_header("FULL TRANSCRIPT")
+    + "{transcript}\n"
+)
+
+def _fingerprint(digest):
+    """Format an xxh3 digest as the 8-hex-char fingerprint (low 32 bits)"""
+    return f"{digest & 0xFFFFFFFF:08x}"
+
+def get_file_hash(audio_file):
+    """Short content fingerprint of an uploaded file, used as the meeting ID suffix.
+    
+    Memoized per upload in session state, so reruns don't re-hash the same file.
+    """
+    file_id = getattr(audio_file, "file_id", None)
+    if file_id is None:
+        return _compute_file_hash(audio_file)
+    
+    file_hashes = st.session_state.setdefault("file_hashes", {})
+    cache_key = (file_id, audio_file.size)
+    if cache_key not in file_hashes:
+        file_hashes[cache_key] = _compute_file_hash(audio_file)
+    return file_hashes[cache_key]
+
+def _compute_file_hash(audio_file):
+    """Hash an uploaded file's content"""
+    # UploadedFile is a BytesIO sharing the upload's bytes, so getvalue() returns
+    # that same object without copying; getbuffer() would force a private copy.
+    return _fingerprint(xxhash.xxh3_64_intdigest(audio_file.getvalue()))
+
+def generate_meeting_id(audio_file, file_hash=None, now=None):
     """Generate unique meeting ID based on file content and timestamp"""
-    file_hash = hashlib.md5(audio_file.getvalue()).hexdigest()[:8]
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    if file_hash is None:
+        file_hash = get_file_hash(audio_file)
+    if now is None:
+        now = datetime.datetime.now()
+    timestamp = now.strftime("%Y%m%d_%H%M%S")
     return f"meeting_{timestamp}_{file_hash}"
 
+def meeting_saved_at(meeting_id):
+    """Save time encoded in a meeting ID as 'YYYY-mm-dd HH:MM:SS', or '' if it has none"""
+    parts = meeting_id.split('_')
+    if len(parts) < 3 or not (len(parts[1]) == 8 and len(parts[2]) == 6 and (parts[1] + parts[2]).isdigit()):
+        return ""
+    date, time = parts[1], parts[2]
+    return f"{date[:4]}-{date[4:6]}-{date[6:]} {time[:2]}:{time[2:4]}:{time[4:]}"
+
+_SIZE_UNITS = ("B", "KB", "MB", "GB")
+
 def format_file_size(size_bytes):
     """Format file size in human readable format"""
-    if size_bytes == 0:
+    if size_bytes <= 0:
         return "0B"
-    size_names = ["B", "KB", "MB", "GB"]
-    i = 0
-    while size_bytes >= 1024 and i < len(size_names) - 1:
-        size_bytes /= 1024.0
-        i += 1
-    return f"{size_bytes:.1f} {size_names[i]}"
-
-def save_meeting_data(meeting_id, transcript, summary_data):
-    """Save meeting data for future reference"""
+    # Each unit is 2**10 of the previous, so the bit length picks the unit directly
+    i = min((size_bytes.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (10 * i)):.1f} {_SIZE_UNITS[i]}"
+
+def _write_atomic(file_path, payload):
+    """Write bytes to a sibling temp file, then rename it over file_path.
+    
+    Readers see either the old file or the complete new one, never a partial write.
+    """
+    tmp_path = f"{file_path}.tmp"
     try:
-        data_dir = "meeting_data"
-        os.makedirs(data_dir, exist_ok=True)
-        
-        meeting_data = {
-            "meeting_id": meeting_id,
-            "timestamp": datetime.datetime.now().isoformat(),
-            "transcript": transcript,
-            "summary": summary_data
-        }
-        
-        file_path = os.path.join(data_dir, f"{meeting_id}.json")
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(meeting_data, f, ensure_ascii=False, indent=2)
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def meeting_id_from_filename(file_name):
+    """Meeting ID for a saved meeting file name, or None if it isn't one"""
+    for suffix in _MEETING_SUFFIXES:
+        if file_name.endswith(suffix):
+            return file_name[:-len(suffix)]
+    return None
+
+def _encode_meeting(meeting_id, transcript, summary_data, pretty, now):
+    """Build the file path and gzipped JSON payload for one meeting"""
+    meeting_data = {
+        "meeting_id": meeting_id,
+        "timestamp": now.isoformat(),
+        "transcript": transcript,
+        "summary": summary_data
+    }
+    
+    file_path = os.path.join(Config.MEETING_DATA_DIR, f"{meeting_id}{_MEETING_SUFFIXES[0]}")
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        payload = orjson.dumps(meeting_data, option=option)
+    elif pretty:
+        payload = json.dumps(meeting_data, ensure_ascii=False, indent=2).encode('utf-8')
+    else:
+        payload = json.dumps(meeting_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # Level 1 favours speed; transcripts still shrink several-fold
+    return file_path, gzip.compress(payload, compresslevel=1)
+
+def save_meeting_data(meeting_id, transcript, summary_data, pretty=False, now=None):
+    """Save meeting data for future reference (compact JSON unless pretty=True)"""
+    if now is None:
+        now = datetime.datetime.now()
+    try:
+        file_path, payload = _encode_meeting(meeting_id, transcript, summary_data, pretty, now)
+        _write_atomic(file_path, payload)
         
         return True, file_path
     except Exception as e:
         return False, str(e)
 
+# Only read on demand (a history report or a reused upload), never by a scan of the whole
+# history; bounded because each entry holds a full transcript and superseded mtimes linger
+@st.cache_data(show_spinner=False, max_entries=32, ttl=3600)
+def _read_meeting_file(file_path, mtime_ns):
+    """Parse a meeting file; mtime_ns is part of the cache key so rewrites invalidate it"""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    if file_path.endswith('.gz'):
+        data = gzip.decompress(data)
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
 def load_meeting_data(meeting_id):
     """Load saved meeting data"""
     try:
-        file_path = os.path.join("meeting_data", f"{meeting_id}.json")
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        for suffix in _MEETING_SUFFIXES:
+            file_path = os.path.join(Config.MEETING_DATA_DIR, f"{meeting_id}{suffix}")
+            # One stat both checks existence and supplies the cache key
+            try:
+                mtime_ns = os.stat(file_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            return _read_meeting_file(file_path, mtime_ns)
     except Exception as e:
         st.error(f"Error loading meeting data: {str(e)}")
     return None
 
+def find_processed_meeting(file_hash):
+    """Load the most recent saved meeting for a file fingerprint, if any"""
+    try:
+        with os.scandir(Config.MEETING_DATA_DIR) as it:
+            matches = [
+                meeting_id for meeting_id in map(meeting_id_from_filename, (entry.name for entry in it))
+                if meeting_id and meeting_id.endswith(f"_{file_hash}")
+            ]
+    except FileNotFoundError:
+        return None
+    
+    if not matches:
+        return None
+    
+    # Meeting IDs start with their timestamp, so the newest sorts last
+    return load_meeting_data(max(matches))
+
 def display_summary_section(title, content, icon="📋"):
     """Display a formatted summary section"""
-    st.markdown(f"### {icon} {title}")
     if content and content.strip():
-        st.markdown(content)
+        # One element per section: fewer deltas to send and diff on every rerun
+        st.markdown(f"### {icon} {title}\n\n{content}\n\n---")
     else:
+        st.markdown(f"### {icon} {title}")
         st.info("No information available for this section.")
-    st.markdown("---")
-
-def create_download_data(meeting_id, transcript, summary_data):
-    """Create downloadable data in multiple formats"""
-    # Text format
-    text_content = f"""MEETING SUMMARY REPORT
-Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-Meeting ID: {meeting_id}
-
-{'='*50}
-MEETING SUMMARY
-{'='*50}
-{summary_data.get('summary', 'Not available')}
-
-{'='*50}
-MEETING INFORMATION
-{'='*50}
-{summary_data.get('meeting_info', 'Not available')}
-
-{'='*50}
-MAIN TOPICS DISCUSSED
-{'='*50}
-{summary_data.get('topics', 'Not available')}
-
-{'='*50}
-ACTION ITEMS & NEXT STEPS
-{'='*50}
-{summary_data.get('action_items', 'Not available')}
-
-{'='*50}
-KEY DECISIONS MADE
-{'='*50}
-{summary_data.get('decisions', 'Not available')}
-
-{'='*50}
-IMPORTANT NOTES & FOLLOW-UPS
-{'='*50}
-{summary_data.get('notes', 'Not available')}
-
-{'='*50}
-FULL TRANSCRIPT
-{'='*50}
-{transcript}
-"""
+        st.markdown("---")
+
+def create_download_data(meeting_id, transcript, summary_data, now=None):
+    """Create the downloadable summary report as UTF-8 bytes"""
+    if now is None:
+        now = datetime.datetime.now()
+    report = _REPORT_TEMPLATE.format(
+        generated_on=now.strftime('%Y-%m-%d %H:%M:%S'),
+        meeting_id=meeting_id,
+        transcript=transcript,
+        **{key: summary_data.get(key, _NOT_AVAILABLE) for key in _REPORT_KEYS}
+    )
     
-    return text_content
+    # Encode once here; st.download_button passes bytes through untouched
+    return report.encode('utf-8')